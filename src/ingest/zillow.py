@@ -100,3 +100,21 @@ def get_zip_series(df, zip_code):
     
     return series
 
+
+def get_zip_panel(df, state=None):
+    """Extract time series for many ZIP codes as a DataFrame (dates x ZIP codes)."""
+    if state is not None:
+        df = df[df["State"].astype(str).str.upper() == str(state).upper()]
+        if df.empty:
+            raise ValueError(f"No ZIP codes found in Zillow data for state {state}")
+    
+    # Extract date columns (format: YYYY-MM-DD)
+    date_cols = [col for col in df.columns if col.startswith("20") and "-" in col]
+    
+    # ZIP codes are stored without leading zeros, restore them for labels
+    zip_codes = df["RegionName"].astype(str).str.zfill(5)
+    
+    panel = pd.DataFrame(df[date_cols].to_numpy(dtype=float).T, index=pd.to_datetime(date_cols), columns=zip_codes.values)
+    panel = panel.dropna(how="all").sort_index()
+    
+    return panel
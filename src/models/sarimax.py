@@ -1,11 +1,50 @@
 """SARIMAX model for forecasting."""
 
+import numpy as np
 import pandas as pd
+from scipy.optimize import minimize
+from scipy.stats import norm
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 import warnings
 warnings.filterwarnings("ignore")
 
 
+def _forecast_index(last_date, steps):
+    """Monthly date index for the forecast horizon after last_date."""
+    # Simple approach: start from next month using month end frequency
+    start_date = pd.Timestamp(last_date).replace(day=1) + pd.DateOffset(months=1)
+    return pd.date_range(start=start_date, periods=steps, freq="ME")  # ME = Month End
+
+
+def _aligned_sample(values, max_series, seed=0):
+    """Random sample of gap-free series, each shifted to start at its first observation.
+    
+    Returns the shifted dates x series values (longest series first, missing
+    only at the end), each series' number of observations and the row of
+    its first observation in values.
+    """
+    observed = ~np.isnan(values)
+    first = observed.argmax(axis=0)
+    lengths = observed.sum(axis=0)
+    last = len(values) - observed[::-1].argmax(axis=0)
+    candidates = np.flatnonzero((lengths > 0) & (last - first == lengths))
+    if len(candidates) == 0:
+        raise ValueError("Estimation needs at least one series without interior gaps; pass spec= instead")
+    if len(candidates) > max_series:
+        candidates = np.random.default_rng(seed).choice(candidates, max_series, replace=False)
+    candidates = candidates[np.argsort(-lengths[candidates], kind="stable")]
+    
+    rows = np.arange(len(values))[:, None] + first[candidates]
+    shifted = np.where(rows < len(values), values[np.minimum(rows, len(values) - 1), candidates], np.nan)
+    return shifted, lengths[candidates], first[candidates]
+
+
+def _missing_patterns(values):
+    """Distinct observed-masks (patterns x dates) of dates x series values and each series' pattern index."""
+    patterns, inverse = np.unique(~np.isnan(values.T), axis=0, return_inverse=True)
+    return patterns, inverse.ravel()
+
+
 class SARIMAXForecaster:
     """SARIMAX forecasting model."""
     
@@ -47,9 +86,7 @@ class SARIMAXForecaster:
             forecast = self.fitted_model.forecast(steps=steps, exog=exog)
         
         # Create proper monthly date index starting from the month after last_date
-        # Simple approach: start from next month using month end frequency
-        start_date = pd.Timestamp(self.last_date).replace(day=1) + pd.DateOffset(months=1)
-        dates = pd.date_range(start=start_date, periods=steps, freq="ME")  # ME = Month End
+        dates = _forecast_index(self.last_date, steps)
         
         # Ensure forecast is not NaN
         if forecast.isna().all():
@@ -62,3 +99,304 @@ class SARIMAXForecaster:
         
         return pd.Series(forecast.values, index=dates, name="Forecast")
 
+
+class BatchSARIMAXForecaster:
+    """SARIMAX forecasting for many series that share one set of parameters.
+    
+    One SARIMAX specification is estimated for the whole panel by maximizing
+    the pooled likelihood of all series (or supplied via ``spec``), then the
+    Kalman filter and forecasts run for every series at once on stacked
+    NumPy arrays instead of one statsmodels model per ZIP.
+    
+    With ``normalize=True`` each series is divided by its last observed value
+    before filtering, so ZIPs at different price levels share the dynamics
+    and the relative noise level. Forecasts are scaled back afterwards.
+    
+    Estimation uses a random sample of at most ``max_estimation_series``
+    series without interior gaps, each shifted to start at its first
+    observation. All sampled series then share one state covariance, so
+    each likelihood evaluation is a single cheap pass over the dates.
+    """
+    
+    def __init__(self, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12), normalize=True,
+                 max_estimation_series=500):
+        self.order = order
+        self.seasonal_order = seasonal_order
+        self.normalize = normalize
+        self.max_estimation_series = max_estimation_series
+        self.model = None
+        self.params = None
+        self.scale = None
+        self.columns = None
+        self.last_date = None
+        self._state_mean = None  # predicted state per series
+        self._state_cov = None  # predicted state covariance per missing-data pattern
+        self._inverse = None  # missing-data pattern of each series
+    
+    @property
+    def spec(self):
+        """Fitted (order, seasonal_order, params), reusable as ``fit(spec=...)``."""
+        if self.params is None:
+            return None
+        return (self.order, self.seasonal_order, self.params)
+    
+    def fit(self, Y, exog=None, spec=None):
+        """Filter every column of Y (dates x series) with shared parameters.
+        
+        If spec is None, the parameters maximize the pooled likelihood of all
+        (normalized) series, starting from a fit on their median. Otherwise
+        spec is an (order, seasonal_order, params) tuple reused as-is, e.g.
+        an earlier run's ``spec`` attribute.
+        exog, if given, is shared by all series and indexed like Y.
+        """
+        Y = Y.sort_index().astype(float)
+        if Y.empty:
+            raise ValueError("No series to fit")
+        
+        if self.normalize:
+            scale = Y.ffill().iloc[-1]
+            invalid = scale.isna() | (scale == 0)
+            if invalid.any():
+                raise ValueError(f"Cannot normalize series without a nonzero last value: {list(scale.index[invalid])}")
+        else:
+            scale = pd.Series(1.0, index=Y.columns)
+        Y_scaled = Y / scale
+        
+        if exog is not None:
+            exog = exog.reindex(Y.index)
+        
+        # Representative series used to specify the model and start estimation
+        reference = Y_scaled.median(axis=1)
+        if spec is None:
+            forecaster = SARIMAXForecaster(order=self.order, seasonal_order=self.seasonal_order)
+            forecaster.fit(reference, exog=exog)
+            model = forecaster.model
+            params = forecaster.fitted_model.params
+        else:
+            order, seasonal_order, params = spec
+            model = SARIMAX(reference, exog=exog, order=order, seasonal_order=seasonal_order)
+            if len(params) != model.k_params:
+                raise ValueError(
+                    f"Expected {model.k_params} parameters for order={order}, "
+                    f"seasonal_order={seasonal_order}, got {len(params)}"
+                )
+        
+        # Series with the same missing-data pattern share the state covariance,
+        # so one covariance is tracked per pattern rather than per series
+        values = Y_scaled.to_numpy()
+        data = (values, *_missing_patterns(values))
+        
+        params = np.asarray(params, dtype=float)
+        if spec is None:
+            params = self._estimate(model, _aligned_sample(values, self.max_estimation_series), exog, params)
+        
+        state_mean, state_cov, _ = self._filter(model, data, exog, params)
+        
+        # Only store the fit once everything succeeded, keeping the
+        # specification actually used, which may be the fallback
+        self.model = model
+        self.order = model.order
+        self.seasonal_order = model.seasonal_order
+        self.params = params
+        self.scale = scale.to_numpy()
+        self.last_date = Y.index[-1]
+        self.columns = Y.columns
+        self._state_mean = state_mean
+        self._state_cov = state_cov
+        self._inverse = data[2]
+        return self
+    
+    def predict(self, steps, exog=None):
+        """Predict future values for every series (dates x series)."""
+        mean, _ = self._forecast(steps, exog)
+        dates = _forecast_index(self.last_date, steps)
+        return pd.DataFrame(mean, index=dates, columns=self.columns)
+    
+    def predict_interval(self, steps, exog=None, alpha=0.05):
+        """Predict (lower, upper) bounds of the 1 - alpha forecast interval."""
+        mean, var = self._forecast(steps, exog)
+        width = norm.ppf(1 - alpha / 2) * np.sqrt(var)
+        dates = _forecast_index(self.last_date, steps)
+        lower = pd.DataFrame(mean - width, index=dates, columns=self.columns)
+        upper = pd.DataFrame(mean + width, index=dates, columns=self.columns)
+        return lower, upper
+    
+    @staticmethod
+    def _obs_intercept(model, params, exog, nobs):
+        """Observation intercept per time step, shared by all series."""
+        k_exog = model.k_exog
+        if not k_exog:
+            return np.full(nobs, model.ssm["obs_intercept"][0])
+        if exog is None:
+            raise ValueError("exog is required for a model fitted with exogenous variables")
+        exog = np.asarray(exog, dtype=float).reshape(nobs, k_exog)
+        # Regression coefficients come first in the SARIMAX parameter vector
+        return exog @ params[:k_exog]
+    
+    @staticmethod
+    def _system(model):
+        """Time-invariant state space matrices of the model's current parameters."""
+        ssm = model.ssm
+        selection = ssm["selection"]
+        return (
+            ssm["design"][0],
+            ssm["obs_cov"][0, 0],
+            ssm["transition"],
+            ssm["state_intercept"],
+            selection @ ssm["state_cov"] @ selection.T,
+        )
+    
+    def _estimate(self, model, sample, exog, params):
+        """Maximize the pooled log-likelihood of the aligned sample over the parameters."""
+        # The median averages away each series' own noise, so first rescale
+        # the variance to the pooled standardized one-step residuals
+        _, ssr, nobs = self._loglike(model, sample, exog, params)
+        params = params.copy()
+        params[model.param_names.index("sigma2")] *= ssr / nobs
+        
+        # Optimize the variance on a log scale; statsmodels' own square-root
+        # transform is badly scaled for the small normalized variances
+        i_sigma2 = model.param_names.index("sigma2")
+        
+        def to_params(x):
+            constrained = model.transform_params(x)
+            constrained[i_sigma2] = np.exp(x[i_sigma2])
+            return constrained
+        
+        def objective(x):
+            constrained = to_params(x)
+            if not np.all(np.isfinite(constrained)):
+                return np.inf
+            try:
+                loglike, _, nobs = self._loglike(model, sample, exog, constrained)
+            except (np.linalg.LinAlgError, ValueError):
+                # Trial parameters at the edge of stationarity
+                return np.inf
+            return -loglike / nobs
+        
+        start = model.untransform_params(params)
+        start[i_sigma2] = np.log(params[i_sigma2])
+        result = minimize(objective, start, method="L-BFGS-B", options={"maxiter": 200, "ftol": 1e-7})
+        # Keep the rescaled starting point if the optimizer went nowhere useful
+        if not np.isfinite(result.fun) or result.fun > objective(start):
+            return params
+        return to_params(result.x)
+    
+    def _loglike(self, model, sample, exog, params):
+        """Pooled (log-likelihood, sum of squared standardized residuals,
+        number of observations) of an aligned sample from _aligned_sample.
+        
+        Each series starts at row 0, so all series still reporting share one
+        state covariance; series drop out of the arrays once they end. As in
+        _filter, each series' first ``loglikelihood_burn`` observations are
+        left out.
+        """
+        values, lengths, first = sample
+        model.update(params)
+        obs_intercept = self._obs_intercept(model, params, exog, len(values))
+        design, obs_cov, transition, state_intercept, state_cov = self._system(model)
+        
+        ssm = model.ssm
+        initial_mean, diffuse_cov, stationary_cov = ssm.initialization(model=ssm)
+        cov = stationary_cov + ssm.initial_variance * diffuse_cov
+        mean = np.tile(initial_mean, (values.shape[1], 1))
+        
+        loglike = ssr = nobs = 0.0
+        for t in range(lengths[0]):
+            # Series are sorted longest first, so the ones still reporting lead
+            n_active = np.count_nonzero(lengths > t)
+            mean = mean[:n_active]
+            
+            cov_design = cov @ design
+            forecast_var = cov_design @ design + obs_cov
+            resid = values[t, :n_active] - mean @ design - obs_intercept[t + first[:n_active]]
+            if t >= model.loglikelihood_burn:
+                ssr_t = resid @ resid / forecast_var
+                loglike -= 0.5 * (n_active * np.log(2 * np.pi * forecast_var) + ssr_t)
+                ssr += ssr_t
+                nobs += n_active
+            mean = mean + np.outer(resid / forecast_var, cov_design)
+            cov = cov - np.outer(cov_design, cov_design) / forecast_var
+            
+            mean = mean @ transition.T + state_intercept
+            cov = transition @ cov @ transition.T + state_cov
+            cov = (cov + cov.T) / 2
+        
+        return loglike, ssr, nobs
+    
+    def _filter(self, model, data, exog, params):
+        """Run the Kalman filter on all series at once with the given parameters.
+        
+        Only the model's system matrices are updated to params; the fitted
+        state on the instance is left alone.
+        
+        data is (values, patterns, inverse): the dates x series values, the
+        distinct observed-masks (patterns x dates) and each series' pattern.
+        Returns the predicted state means (series x states) and covariances
+        (patterns x states x states) after the last observation, plus the
+        pooled (log-likelihood, sum of squared standardized residuals, number
+        of observations). The first ``loglikelihood_burn`` observations of
+        each series, dominated by the diffuse initialization, are left out of
+        these statistics.
+        """
+        values, patterns, inverse = data
+        model.update(params)
+        obs_intercept = self._obs_intercept(model, params, exog, len(values))
+        design, obs_cov, transition, state_intercept, state_cov = self._system(model)
+        
+        # Initial state from the model's own (approximate diffuse/stationary) initialization
+        ssm = model.ssm
+        initial_mean, diffuse_cov, stationary_cov = ssm.initialization(model=ssm)
+        initial_cov = stationary_cov + ssm.initial_variance * diffuse_cov
+        
+        # Only observed dates past the burn-in of their own series count
+        counted = patterns & (np.cumsum(patterns, axis=1) > model.loglikelihood_burn)
+        n_per_pattern = np.bincount(inverse, minlength=len(patterns))
+        
+        mean = np.tile(initial_mean, (values.shape[1], 1))
+        cov = np.tile(initial_cov, (len(patterns), 1, 1))
+        loglike = ssr = nobs = 0.0
+        for t in range(len(values)):
+            observed = patterns[:, t]
+            if observed.any():
+                # Update step, skipped for patterns missing this date
+                cov_design = cov @ design
+                forecast_var = cov_design @ design + obs_cov
+                gain = np.where(observed[:, None], cov_design / forecast_var[:, None], 0.0)
+                resid = np.nan_to_num(values[t] - mean @ design - obs_intercept[t])
+                mean = mean + resid[:, None] * gain[inverse]
+                cov = cov - gain[:, :, None] * cov_design[:, None, :]
+                
+                # Pooled likelihood contributions of this date
+                counted_t = counted[:, t]
+                ssr_t = (resid ** 2 / forecast_var[inverse])[counted_t[inverse]].sum()
+                n_t = n_per_pattern[counted_t]
+                loglike -= 0.5 * (n_t @ np.log(2 * np.pi * forecast_var[counted_t]) + ssr_t)
+                ssr += ssr_t
+                nobs += n_t.sum()
+            # Prediction step
+            mean = mean @ transition.T + state_intercept
+            cov = transition @ cov @ transition.T + state_cov
+            # Keep the covariance symmetric, as statsmodels does
+            cov = (cov + cov.transpose(0, 2, 1)) / 2
+        
+        return mean, cov, (loglike, ssr, nobs)
+    
+    def _forecast(self, steps, exog=None):
+        """Forecast means and variances for every series in original units."""
+        if self._state_mean is None:
+            raise ValueError("Model must be fitted first")
+        
+        design, obs_cov, transition, state_intercept, state_cov = self._system(self.model)
+        obs_intercept = self._obs_intercept(self.model, self.params, exog, steps)
+        
+        state_mean, cov = self._state_mean, self._state_cov
+        mean = np.empty((steps, len(self.columns)))
+        var = np.empty((steps, len(self.columns)))
+        for h in range(steps):
+            mean[h] = state_mean @ design + obs_intercept[h]
+            var[h] = (cov @ design @ design + obs_cov)[self._inverse]
+            state_mean = state_mean @ transition.T + state_intercept
+            cov = transition @ cov @ transition.T + state_cov
+        
+        return mean * self.scale, var * self.scale ** 2